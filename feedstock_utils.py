@@ -6,11 +6,116 @@ This module provides common functions used by release automation scripts
 for Go, Node.js, and other language ecosystems.
 """
 
-import requests
+import json
 import subprocess
 import os
 import re
-from packaging.version import parse as parse_version
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from packaging.version import parse as _parse_version
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
+
+# Shared HTTP session so that repeated requests to the same host (GitHub tag
+# pagination, anaconda.org lookups) reuse pooled keep-alive connections.
+# Responses are cached on disk and revalidated with ETag/Last-Modified, so
+# repeated runs mostly get cheap 304 responses.
+# Only API-like responses are cached, release archives that are downloaded
+# for hashing would just bloat the cache.
+SESSION = CachedSession(
+    "~/.cache/cf-tooling/http",
+    backend="sqlite",
+    expire_after=3600,
+    cache_control=True,
+    filter_fn=lambda response: response.headers.get("Content-Type", "").startswith(
+        ("application/json", "text/")
+    ),
+)
+SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+        ),
+    ),
+)
+SESSION.headers["User-Agent"] = "cf-tooling"
+
+GITHUB_HEADERS = {"Accept": "application/vnd.github+json"}
+if os.environ.get("GITHUB_TOKEN"):
+    # Authenticated requests get a much higher rate limit
+    GITHUB_HEADERS["Authorization"] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+
+
+@lru_cache(maxsize=4096)
+def parse_version(version):
+    """Parse a version string, memoized as the same strings are compared repeatedly."""
+    return _parse_version(version)
+
+
+def parse_json_response(response):
+    """Decode a JSON response body, using orjson if it is installed."""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+# Version patterns for recipe.yaml ("  version: x.y.z", optionally quoted)
+# and meta.yaml ({% set version = "x.y.z" %})
+_VERSION_RECIPE_RE = re.compile(r'^\s*version:\s*["\']?([0-9.]+)["\']?', re.MULTILINE)
+_VERSION_META_RE = re.compile(r'{%\s*set\s+version\s*=\s*["\']([^"\']+)["\']\s*%}')
+
+
+def _search_recipe_file(path, pattern, head_size=4096):
+    """
+    Search a recipe file for a pattern, reading only its head if possible.
+
+    The version is conventionally defined at the top of a recipe, so the rest
+    of the file is only read if the pattern is not found in the first
+    head_size characters.
+    """
+    with open(path, "r") as f:
+        content = f.read(head_size)
+        # Only consider complete lines so a version cut off at the end of
+        # the head is not matched partially
+        match = pattern.search(content, 0, content.rfind("\n") + 1)
+        if match is None:
+            content += f.read()
+            match = pattern.search(content)
+    return match
+
+
+def run_shell(repo_path, script):
+    """
+    Run a bash script in repo_path, stopping at the first failing command.
+
+    Used to batch commands whose intermediate output isn't needed into a
+    single process spawn. Arguments must be quoted with shlex.quote.
+
+    Args:
+        repo_path: Directory to run the script in
+        script: Shell script, e.g. "git add foo && git commit -m bar"
+    """
+    subprocess.run(
+        ["bash", "-euo", "pipefail", "-c", script], cwd=repo_path, check=True
+    )
 
 
 def get_github_tags(owner, repo):
@@ -22,10 +127,10 @@ def get_github_tags(owner, repo):
     while True:
         url = f"https://api.github.com/repos/{owner}/{repo}/tags"
         params = {"page": page, "per_page": per_page}
-        response = requests.get(url, params=params)
+        response = SESSION.get(url, params=params, headers=GITHUB_HEADERS)
         response.raise_for_status()
 
-        page_tags = response.json()
+        page_tags = parse_json_response(response)
         if not page_tags:
             break
 
@@ -35,6 +140,116 @@ def get_github_tags(owner, repo):
     return tags
 
 
+def get_matching_tags(owner, repo, prefix):
+    """
+    Fetch the names of all tags starting with a prefix.
+
+    The filtering happens server-side, which is much cheaper than paging
+    through all tags of a repository with many releases.
+
+    Args:
+        owner: Repository owner (e.g., "golang")
+        repo: Repository name (e.g., "go")
+        prefix: Tag name prefix (e.g., "go1.23.")
+
+    Returns:
+        List of tag names
+    """
+    url = f"https://api.github.com/repos/{owner}/{repo}/git/matching-refs/tags/{prefix}"
+    names = []
+
+    while url:
+        response = SESSION.get(url, headers=GITHUB_HEADERS)
+        response.raise_for_status()
+        names.extend(
+            ref["ref"].removeprefix("refs/tags/") for ref in parse_json_response(response)
+        )
+        url = response.links.get("next", {}).get("url")
+
+    return names
+
+
+def get_matching_tags_by_prefix(owner, repo, prefixes):
+    """
+    Fetch the names of recent tags for several prefixes at once.
+
+    With a GITHUB_TOKEN, a single GraphQL query returns up to 100 of the
+    most recent tags for every prefix. GraphQL requires authentication, so
+    without a token this falls back to concurrent get_matching_tags calls.
+
+    Args:
+        owner: Repository owner (e.g., "nodejs")
+        repo: Repository name (e.g., "node")
+        prefixes: List of tag name prefixes (e.g., ["v20.", "v22."])
+
+    Returns:
+        Dict mapping each prefix to a list of tag names
+    """
+    if "Authorization" not in GITHUB_HEADERS:
+        with ThreadPoolExecutor(max_workers=len(prefixes)) as executor:
+            return dict(zip(
+                prefixes,
+                executor.map(lambda prefix: get_matching_tags(owner, repo, prefix), prefixes),
+            ))
+
+    # One aliased refs() field per prefix, JSON string escaping is valid GraphQL
+    fields = " ".join(
+        f"p{i}: refs(refPrefix: \"refs/tags/\", query: {json.dumps(prefix)}, first: 100, "
+        f"orderBy: {{field: TAG_COMMIT_DATE, direction: DESC}}) {{ nodes {{ name }} }}"
+        for i, prefix in enumerate(prefixes)
+    )
+    query = (
+        "query($owner: String!, $name: String!) "
+        f"{{ repository(owner: $owner, name: $name) {{ {fields} }} }}"
+    )
+    response = SESSION.post(
+        "https://api.github.com/graphql",
+        json={"query": query, "variables": {"owner": owner, "name": repo}},
+        headers=GITHUB_HEADERS,
+    )
+    response.raise_for_status()
+    result = parse_json_response(response)
+    if result.get("errors"):
+        raise RuntimeError(f"GraphQL query failed: {result['errors']}")
+
+    repository = result["data"]["repository"]
+    # The refs query is a name search rather than a prefix match
+    return {
+        prefix: [
+            node["name"] for node in repository[f"p{i}"]["nodes"]
+            if node["name"].startswith(prefix)
+        ]
+        for i, prefix in enumerate(prefixes)
+    }
+
+
+def get_remote_tags(owner, repo):
+    """
+    Fetch all tag names of a GitHub repository using git ls-remote.
+
+    This is a single round-trip over the git protocol and does not count
+    against the GitHub API rate limit.
+
+    Args:
+        owner: Repository owner (e.g., "golang")
+        repo: Repository name (e.g., "go")
+
+    Returns:
+        List of tag names
+    """
+    result = subprocess.run(
+        ["git", "ls-remote", "--tags", "--refs", f"https://github.com/{owner}/{repo}.git"],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    # Lines look like "<sha>\trefs/tags/<name>"
+    return [
+        line.split("\t", 1)[1].removeprefix("refs/tags/")
+        for line in result.stdout.splitlines()
+    ]
+
+
 def get_current_version_from_recipe(repo_path):
     """
     Extract current version from recipe.yaml or meta.yaml.
@@ -50,23 +265,48 @@ def get_current_version_from_recipe(repo_path):
     # Try recipe.yaml first (newer format)
     recipe_yaml_path = os.path.join(repo_path, "recipe", "recipe.yaml")
     if os.path.exists(recipe_yaml_path):
-        with open(recipe_yaml_path, "r") as f:
-            content = f.read()
-
         # Look for version in context section: "  version: x.y.z" or '  version: "x.y.z"'
         # Handle both quoted and unquoted versions
-        match = re.search(r'^\s*version:\s*["\']?([0-9.]+)["\']?', content, re.MULTILINE)
+        match = _search_recipe_file(recipe_yaml_path, _VERSION_RECIPE_RE)
         if match:
             return match.group(1)
 
     # Fall back to meta.yaml (older format)
     meta_yaml_path = os.path.join(repo_path, "recipe", "meta.yaml")
     if os.path.exists(meta_yaml_path):
-        with open(meta_yaml_path, "r") as f:
-            content = f.read()
-
         # Look for {% set version = "x.y.z" %}
-        match = re.search(r'{%\s*set\s+version\s*=\s*["\']([^"\']+)["\']\s*%}', content)
+        match = _search_recipe_file(meta_yaml_path, _VERSION_META_RE)
+        if match:
+            return match.group(1)
+
+    return None
+
+
+def get_remote_version_from_recipe(repo_name, branch_name):
+    """
+    Extract the version from a feedstock's recipe on GitHub without cloning.
+
+    Like get_current_version_from_recipe, recipe.yaml is tried first and
+    meta.yaml second.
+
+    Args:
+        repo_name: Full repository name (e.g., "conda-forge/go-feedstock")
+        branch_name: Branch to read the recipe from (e.g., "1.20.x")
+
+    Returns:
+        Version string or None if not found (e.g., the branch doesn't exist)
+    """
+    for filename, pattern in (
+        ("recipe.yaml", _VERSION_RECIPE_RE),
+        ("meta.yaml", _VERSION_META_RE),
+    ):
+        url = f"https://raw.githubusercontent.com/{repo_name}/{branch_name}/recipe/{filename}"
+        response = SESSION.get(url)
+        if response.status_code == 404:
+            continue
+        response.raise_for_status()
+
+        match = pattern.search(response.text)
         if match:
             return match.group(1)
 
@@ -76,22 +316,43 @@ def get_current_version_from_recipe(repo_path):
 def fork_and_clone_feedstock(repo_name, repo_path):
     """
     Fork and clone a feedstock repository if it doesn't exist locally.
+
+    The clone is blobless, file contents are only fetched for the commits
+    that are actually checked out. The branches that are needed are
+    fetched from upstream by checkout_branch.
     
     Args:
         repo_name: Full repository name (e.g., "conda-forge/go-feedstock")
         repo_path: Local path where repository should be cloned
     """
     if os.path.exists(repo_path):
-        print(f"Repository {repo_path} already exists, updating...")
-        subprocess.run(["git", "-C", repo_path, "fetch", "upstream"], check=True)
-    else:
-        print(f"Forking and cloning {repo_name}...")
-        subprocess.run(["gh", "repo", "fork", repo_name, "--clone"], check=True)
+        print(f"Repository {repo_path} already exists")
+        return
+
+    print(f"Forking and cloning {repo_name}...")
+    # Arguments after "--" are passed on to git clone, gh takes the first
+    # one as the target directory. The history is kept complete (no
+    # --depth) as pushing commits on top of a shallow upstream fetch to a
+    # fork that is behind upstream is rejected by GitHub.
+    # The progress output isn't needed, errors are still shown.
+    result = subprocess.run(
+        ["gh", "repo", "fork", repo_name, "--clone", "--",
+         repo_path, "--filter=blob:none", "--no-tags"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        print(result.stderr.decode("utf-8", "replace"), end="")
+        result.check_returncode()
 
 
 def checkout_branch(repo_path, branch_name):
     """
-    Checkout a branch from upstream and pull latest changes.
+    Checkout a branch at the state of upstream.
+
+    Only this branch is fetched from upstream, and the local branch is
+    reset to upstream/<branch_name> instead of pulling, which reuses the
+    existing working tree.
     
     Args:
         repo_path: Path to the repository
@@ -101,16 +362,19 @@ def checkout_branch(repo_path, branch_name):
         True if successful, False if branch doesn't exist
     """
     print(f"Checking out upstream/{branch_name}...")
+    fetch = subprocess.run(
+        ["git", "-C", repo_path, "fetch", "--no-tags", "upstream", branch_name],
+        capture_output=True
+    )
+    if fetch.returncode != 0:
+        return False
+
     try:
         subprocess.run(
-            ["git", "-C", repo_path, "checkout", branch_name], 
+            ["git", "-C", repo_path, "checkout", "-B", branch_name, f"upstream/{branch_name}"],
             check=True, 
             capture_output=True
         )
-        subprocess.run(
-            ["git", "-C", repo_path, "pull", "upstream", branch_name], 
-            check=True
-        )
         return True
     except subprocess.CalledProcessError:
         return False
@@ -125,6 +389,12 @@ def create_update_branch(repo_path, branch_name):
         branch_name: Name of the new branch
     """
     print(f"Creating update branch {branch_name}...")
+    if pygit2 is not None:
+        repo = pygit2.Repository(repo_path)
+        branch = repo.branches.local.create(branch_name, repo.head.peel(pygit2.Commit))
+        repo.checkout(branch)
+        return
+
     subprocess.run(
         ["git", "-C", repo_path, "checkout", "-b", branch_name], 
         check=True
@@ -137,41 +407,69 @@ def commit_changes(repo_path, files, commit_message):
     
     Args:
         repo_path: Path to the repository
-        files: List of file paths to add (relative to repo_path)
+        files: List of file paths to add (relative to repo_path), or None
+            to stage all changes including new and deleted files
         commit_message: Commit message
     """
+    if files is not None and not files:
+        return
+
     print(f"Committing changes: {commit_message}")
-    for file in files:
-        subprocess.run(
-            ["git", "-C", repo_path, "add", file],
-            check=True
+    if pygit2 is not None:
+        # Local-only operation, do it in-process instead of spawning git
+        repo = pygit2.Repository(repo_path)
+        # add_all without pathspecs stages everything
+        repo.index.add_all(files)
+        repo.index.write()
+        signature = repo.default_signature
+        repo.create_commit(
+            "HEAD", signature, signature, commit_message,
+            repo.index.write_tree(), [repo.head.target]
         )
-    subprocess.run(
-        ["git", "-C", repo_path, "commit", "-m", commit_message],
-        check=True
-    )
+        return
+
+    add_args = "-A" if files is None else "-- " + " ".join(map(shlex.quote, files))
+    run_shell(repo_path, f"git add {add_args} && git commit -m {shlex.quote(commit_message)}")
 
 
-def run_conda_smithy_rerender(repo_path):
+def run_conda_smithy_rerender(repo_path, commit=True, verbose=False):
     """
     Run conda-smithy rerender and commit changes if any.
     
     Args:
         repo_path: Path to the repository
+        commit: If False, leave the rerendered files uncommitted so they can
+            be committed together with the recipe changes
+        verbose: If True, show the conda-smithy output, otherwise only its
+            stderr is shown and only if the rerender fails
         
     Returns:
         True if rerender was successful, False otherwise
     """
     print("Running conda-smithy rerender...")
-    result = subprocess.run(
-        ["conda-smithy", "rerender", "--no-check-uptodate", "--commit", "auto"],
-        cwd=repo_path,
-        capture_output=True,
-        text=True
-    )
+    cmd = ["conda-smithy", "rerender", "--no-check-uptodate"]
+    if commit:
+        cmd += ["--commit", "auto"]
+
+    if verbose:
+        # Output goes straight to the terminal
+        result = subprocess.run(cmd, cwd=repo_path)
+    else:
+        # Discard the progress output instead of passing it through Python,
+        # stderr is kept for the failure message
+        result = subprocess.run(
+            cmd,
+            cwd=repo_path,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
 
     if result.returncode != 0:
-        print(f"Warning: conda-smithy rerender failed: {result.stderr}")
+        print("Warning: conda-smithy rerender failed")
+        if result.stderr:
+            # Only the end of the output is relevant for the error
+            stderr_tail = result.stderr.decode("utf-8", "replace").splitlines()[-200:]
+            print("\n".join(stderr_tail))
         print("Continuing anyway...")
         return False
 
@@ -222,12 +520,12 @@ def create_pull_request(
          "--title", title,
          "--body", body] + args,
         cwd=repo_path,
-        capture_output=True,
-        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
         check=True
     )
 
-    pr_url = pr_result.stdout.strip()
+    pr_url = pr_result.stdout.decode("utf-8", "replace").strip()
     print(f"Pull request created: {pr_url}")
     return pr_url
 
@@ -1,21 +1,36 @@
-import requests
 import time
 import yaml
 import subprocess
 import re
 import os
-from packaging.version import parse as parse_version
+import shlex
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from feedstock_utils import SESSION, parse_json_response, parse_version, run_shell
 
+# Prefer the libyaml-backed loader, conda_build_config.yaml is large
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
+# Matches block-style pins like "aws_c_common:\n  - '0.9.0'"
+_PIN_RE = re.compile(r'^(aws_[a-z0-9_]+|s2n):\s*\n\s*-\s*[\'"]?([0-9][0-9.]*)', re.MULTILINE)
 
+
+
+@functools.lru_cache(maxsize=None)
 def get_most_recent_version(name):
-    request = requests.get("https://api.anaconda.org/package/conda-forge/" + name)
+    # The package endpoint has no field projection and its latest_version
+    # does not account for files marked broken, so the file list is needed.
+    # Repeated runs are served from the HTTP cache via ETag revalidation.
+    request = SESSION.get("https://api.anaconda.org/package/conda-forge/" + name)
     request.raise_for_status()
-    files = request.json()["files"]
-    files = [f for f in files if "broken" not in f.get("labels", ())]
-    pkg = max(files, key=lambda x: parse_version(x["version"]))
-
-    return pkg["version"]
+    files = parse_json_response(request)["files"]
+    # Many files share a version (one per platform), so deduplicate before
+    # comparing to parse each distinct version only once
+    versions = {f["version"] for f in files if "broken" not in f.get("labels", ())}
+    return max(versions, key=parse_version)
 
 
 packages = [
@@ -53,39 +68,56 @@ repo_path = "conda-forge-pinning-feedstock"
 
 if os.path.exists(repo_path):
     print("Repository already exists, updating...")
-    subprocess.run(["git", "-C", repo_path, "fetch", "upstream"], check=True)
-    subprocess.run(["git", "-C", repo_path, "checkout", "main"], check=True)
-    subprocess.run(["git", "-C", repo_path, "merge", "upstream/main"], check=True)
+    # The migration branch is created directly off upstream/main below, so
+    # there is no need to update the local main branch
+    update_script = "git fetch --no-tags upstream main && "
 else:
     print("Forking and cloning repository...")
     subprocess.run(["gh", "repo", "fork", repo_name, "--clone"], check=True)
+    update_script = ""
 
 # Create new branch based on upstream/main
 print(f"Creating branch {branch_name} based on upstream/main...")
-subprocess.run(["git", "-C", repo_path, "checkout", "-b", branch_name, "upstream/main"], check=True)
+run_shell(repo_path, update_script + f"git checkout -B {shlex.quote(branch_name)} upstream/main")
 
-# Get config from local file
+# Get config from local file, only the aws-c-* pins are needed so extract
+# them with a regex instead of parsing the whole file
 with open(os.path.join(repo_path, "recipe", "conda_build_config.yaml"), "r") as f:
-    config = yaml.safe_load(f)
+    raw_config = f.read()
+config = {m.group(1): m.group(2) for m in _PIN_RE.finditer(raw_config)}
 
-# Check each package for version updates
-updated_packages = {}
+# Fall back to a full YAML parse if a pin is written in a form the regex
+# does not cover (e.g. a flow-style list)
+if any(package.replace('-', '_') not in config for package in packages):
+    config = yaml.load(raw_config, Loader=SafeLoader)
+
+# Collect the current pins (config keys use underscores instead of hyphens)
+current_versions = {}
 for package in packages:
-    # Convert hyphens to underscores for config lookup
-    config_key = package.replace('-', '_')
-    current_version = config.get(config_key)
+    current_version = config.get(package.replace('-', '_'))
     if current_version:
         # Handle list format in YAML (e.g., package: ['1.2.3'])
         if isinstance(current_version, list):
             current_version = current_version[0]
+        current_versions[package] = current_version
 
-        latest_version = get_most_recent_version(package)
+# Look up the latest versions concurrently, the lookups are network-bound
+with ThreadPoolExecutor(max_workers=8) as executor:
+    latest_versions = dict(
+        zip(current_versions, executor.map(get_most_recent_version, current_versions))
+    )
 
-        if parse_version(latest_version) > parse_version(current_version):
-            updated_packages[config_key] = latest_version
-            print(f"Update available for {package}: {current_version} -> {latest_version}")
-        else:
-            print(f"No update for {package}: {current_version} is current")
+# Check each package for version updates
+updated_packages = {}
+for package, current_version in current_versions.items():
+    config_key = package.replace('-', '_')
+    latest_version = latest_versions[package]
+
+    if parse_version(latest_version) > parse_version(current_version):
+        updated_packages[config_key] = latest_version
+        print(f"Update available for {package}: {current_version} -> {latest_version}")
+    else:
+        print(f"No update for {package}: {current_version} is current")
 
 # Generate migration content
 migration = f"""__migrator:
@@ -98,9 +130,10 @@ migration = f"""__migrator:
 migrator_ts: {time.time():.0f}
 """
 
-# Add updated packages to migration
-for package, version in updated_packages.items():
-    migration += f"{package}:\n  - '{version}'\n"
+# Add updated packages to migration, versions are quoted so they stay strings
+migration += "".join(
+    f"{package}:\n  - '{version}'\n" for package, version in updated_packages.items()
+)
 
 # Write migration file
 migration_file_path = os.path.join(repo_path, "recipe", "migrations", migration_filename)
@@ -112,15 +145,15 @@ print("\nMigration content:")
 print(migration)
 
 # Commit and push changes
-print("\nCommitting changes...")
-# Use relative path for git add since we're using -C to change directory
+print(f"\nCommitting changes and pushing branch {branch_name} to origin...")
+# Use relative path for git add since the script runs inside repo_path
 relative_migration_path = os.path.join("recipe", "migrations", migration_filename)
-subprocess.run(["git", "-C", repo_path, "add", relative_migration_path], check=True)
 commit_message = f"Add AWS C library migration: {migration_hint}"
-subprocess.run(["git", "-C", repo_path, "commit", "-m", commit_message], check=True)
-
-print(f"Pushing branch {branch_name} to origin...")
-subprocess.run(["git", "-C", repo_path, "push", "-u", "origin", branch_name], check=True)
+run_shell(repo_path, (
+    f"git add {shlex.quote(relative_migration_path)} && "
+    f"git commit -m {shlex.quote(commit_message)} && "
+    f"git push -u origin {shlex.quote(branch_name)}"
+))
 
 # Create pull request
 print("\nCreating pull request...")
@@ -129,15 +162,16 @@ pr_body = f"""aws-c-* migration for {migration_hint}
 
 ## Updated packages:
 """
-for package, version in updated_packages.items():
-    pr_body += f"- {package}: {version}\n"
+pr_body += "".join(
+    f"- {package}: {version}\n" for package, version in updated_packages.items()
+)
 
 pr_result = subprocess.run(
     ["gh", "pr", "create", "-R", repo_name, "--title", pr_title, "--body", pr_body, "--label", "automerge"],
     cwd=repo_path,
-    capture_output=True,
-    text=True,
+    stdout=subprocess.PIPE,
+    stderr=subprocess.PIPE,
     check=True
 )
 
-print(f"\nPull request created: {pr_result.stdout}")
+print(f"\nPull request created: {pr_result.stdout.decode('utf-8', 'replace').strip()}")
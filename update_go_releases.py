@@ -16,20 +16,22 @@ This script:
 Usage:
     python update_go_releases.py           # Run updates
     python update_go_releases.py --dry-run # Preview changes without making them
+    python update_go_releases.py --verbose # Show the conda-smithy rerender output
 """
 
-import requests
 import subprocess
 import os
 import re
 import sys
-import yaml
 import hashlib
-from packaging.version import parse as parse_version
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from feedstock_utils import (
-    get_github_tags,
+    SESSION,
+    get_remote_tags,
     get_current_version_from_recipe,
+    get_remote_version_from_recipe,
     fork_and_clone_feedstock,
     checkout_branch,
     create_update_branch,
@@ -37,9 +39,24 @@ from feedstock_utils import (
     run_conda_smithy_rerender,
     push_branch,
     create_pull_request,
-    check_version_needs_update
+    check_version_needs_update,
+    parse_json_response,
 )
 
+# Release tags like "go1.20.14"
+_GO_TAG_RE = re.compile(r'^go(1)\.(\d+)\.(\d+)$')
+
+# Patterns for updating meta.yaml, applied to the whole file
+_SET_VERSION_RE = re.compile(r'^([ \t]*{%\s*set\s+version\s*=\s*")[^"]+(")', re.MULTILINE)
+_BUILD_NUMBER_RE = re.compile(r'^([ \t]+number:[ \t]*)\d+', re.MULTILINE)
+# A source URL (possibly with Jinja2 variables) up to the sha256 that follows
+# it, without crossing into the next URL
+_SOURCE_SHA256_RE = re.compile(
+    r'(url:[ \t]*(https://(?:[^\s{]|{{\s*\w+\s*}})+)(?:(?!url:)[\s\S])*?sha256:[ \t]*)'
+    r'[a-fA-F0-9]{64}'
+)
+_JINJA_VAR_RE = re.compile(r'{{\s*(\w+)\s*}}')
+
 
 def get_go_versions_by_minor_series(target_series):
     """
@@ -52,31 +69,26 @@ def get_go_versions_by_minor_series(target_series):
         Dict mapping minor series to latest version (e.g., {'1.20': '1.20.14', ...})
     """
     print("Fetching tags from golang/go...")
-    tags = get_github_tags("golang", "go")
+    tags = get_remote_tags("golang", "go")
 
-    # Parse tags and group by minor series
+    # Group tags by minor series, keeping the patch number as an int so the
+    # latest release can be picked without parsing full version objects
     versions_by_series = defaultdict(list)
 
-    for tag in tags:
-        tag_name = tag["name"]
+    for tag_name in tags:
         # Match tags like "go1.20.14" or "go1.21.0"
-        match = re.match(r'^go(1\.\d+\.\d+)$', tag_name)
+        match = _GO_TAG_RE.match(tag_name)
         if match:
-            version_str = match.group(1)
-            try:
-                version = parse_version(version_str)
-                # Extract minor series (e.g., "1.20" from "1.20.14")
-                minor_series = '.'.join(version_str.split('.')[:2])
+            major, minor, patch = match.groups()
+            minor_series = f"{major}.{minor}"
 
-                if minor_series in target_series:
-                    versions_by_series[minor_series].append(version_str)
-            except Exception as e:
-                print(f"Warning: Could not parse version {version_str}: {e}")
+            if minor_series in target_series:
+                versions_by_series[minor_series].append((int(patch), tag_name[2:]))
 
     # Get the latest version for each series
     latest_by_series = {}
     for series, versions in versions_by_series.items():
-        latest = max(versions, key=parse_version)
+        latest = max(versions)[1]
         latest_by_series[series] = latest
         print(f"  {series}.x: latest is {latest}")
 
@@ -98,21 +110,56 @@ def compute_sha256_from_url(url):
     """
     print(f"  Fetching {url}...")
 
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-
-    sha256_hash = hashlib.sha256()
-    for chunk in response.iter_content(chunk_size=8192):
-        sha256_hash.update(chunk)
+    with SESSION.get(url, stream=True) as response:
+        response.raise_for_status()
+        # Let hashlib read straight from the socket, the read loop then runs
+        # in C instead of iterating over chunks in Python
+        response.raw.decode_content = True
+        hash_value = hashlib.file_digest(response.raw, "sha256").hexdigest()
 
-    hash_value = sha256_hash.hexdigest()
     print(f"  SHA256: {hash_value}")
     return hash_value
 
 
+@lru_cache(maxsize=None)
+def get_go_release_index():
+    """
+    Fetch the go.dev release index with the files of all Go releases.
+
+    The index is fetched once per run, across runs the shared session's
+    HTTP cache revalidates it with a conditional request.
+
+    Returns:
+        List of release dicts as published on go.dev
+    """
+    response = SESSION.get("https://go.dev/dl/", params={"mode": "json", "include": "all"})
+    response.raise_for_status()
+    return parse_json_response(response)
+
+
+def get_go_published_sha256(version):
+    """
+    Fetch the SHA256 hashes that go.dev publishes for a Go release.
+
+    Args:
+        version: Go version like "1.23.12"
+
+    Returns:
+        Dict mapping distribution filenames to their SHA256 hashes
+    """
+    for release in get_go_release_index():
+        if release["version"] == f"go{version}":
+            return {file["filename"]: file["sha256"] for file in release["files"]}
+
+    return {}
+
+
 def get_go_sha256_mappings(version):
     """
-    Compute SHA256 hashes for all Go distribution files.
+    Get SHA256 hashes for all Go distribution files.
+
+    The hashes published on go.dev are used where available, only files
+    missing there are downloaded and hashed locally.
 
     Args:
         version: Go version like "1.23.12"
@@ -120,7 +167,7 @@ def get_go_sha256_mappings(version):
     Returns:
         Dict mapping URL patterns to their SHA256 hashes
     """
-    print(f"Computing SHA256 hashes for Go {version} distributions...")
+    print(f"Fetching SHA256 hashes for Go {version} distributions...")
 
     urls = [
         f"https://dl.google.com/go/go{version}.src.tar.gz",
@@ -130,18 +177,40 @@ def get_go_sha256_mappings(version):
         f"https://go.dev/dl/go{version}.darwin-arm64.tar.gz",
     ]
 
+    try:
+        published = get_go_published_sha256(version)
+    except Exception as e:
+        print(f"  Warning: Failed to fetch published hashes: {e}")
+        published = {}
+
     sha256_map = {}
+    missing_urls = []
     for url in urls:
-        try:
-            sha256_map[url] = compute_sha256_from_url(url)
-        except Exception as e:
-            print(f"  Warning: Failed to fetch {url}: {e}")
-            continue
+        filename = url.rsplit("/", 1)[1]
+        if filename in published:
+            sha256_map[url] = published[filename]
+            print(f"  SHA256 ({filename}): {published[filename]}")
+        else:
+            missing_urls.append(url)
+
+    if not missing_urls:
+        return sha256_map
+
+    # The downloads are network-bound and independent, fetch them concurrently
+    with ThreadPoolExecutor(max_workers=len(missing_urls)) as executor:
+        futures = {executor.submit(compute_sha256_from_url, url): url for url in missing_urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                sha256_map[url] = future.result()
+            except Exception as e:
+                print(f"  Warning: Failed to fetch {url}: {e}")
+                continue
 
     return sha256_map
 
 
-def update_feedstock(feedstock_name, minor_series, new_version, dry_run=False):
+def update_feedstock(feedstock_name, minor_series, new_version, dry_run=False, verbose=False):
     """
     Update a Go feedstock for a new version.
 
@@ -150,6 +219,7 @@ def update_feedstock(feedstock_name, minor_series, new_version, dry_run=False):
         minor_series: Minor series like "1.20"
         new_version: New version like "1.20.14"
         dry_run: If True, only check versions without making changes
+        verbose: If True, show the conda-smithy rerender output
 
     Returns:
         True if update was performed (or would be performed), False if skipped
@@ -163,6 +233,12 @@ def update_feedstock(feedstock_name, minor_series, new_version, dry_run=False):
     print(f"Checking {feedstock_name} for {new_version}")
     print(f"{'='*60}")
 
+    # Check the recipe on GitHub first so up-to-date feedstocks aren't cloned.
+    # If it can't be determined, the local check below decides.
+    remote_version = get_remote_version_from_recipe(repo_name, branch_name)
+    if remote_version is not None and not check_version_needs_update(remote_version, new_version):
+        return False
+
     # Fork and clone if needed
     fork_and_clone_feedstock(repo_name, repo_path)
 
@@ -201,68 +277,37 @@ def update_feedstock(feedstock_name, minor_series, new_version, dry_run=False):
     print(f"Updating {meta_yaml_path}...")
 
     with open(meta_yaml_path, "r") as f:
-        lines = f.readlines()
-
-    # Process line by line to update sha256 values correctly
-    updated_lines = []
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-
-        # Update version
-        if re.match(r'\s*{%\s*set\s+version\s*=', line):
-            line = re.sub(
-                r'({% set version = ")[^"]+(")',
-                rf'\g<1>{new_version}\g<2>',
-                line
-            )
-
-        # Update build number
-        elif re.match(r'\s+number:\s*\d+', line):
-            line = re.sub(r'(\s+number:\s*)\d+', r'\g<1>0', line)
-
-        # Update sha256 - look for URL on previous line(s)
-        elif re.match(r'\s+sha256:\s*[a-fA-F0-9]{64}', line):
-            # Search backwards for the corresponding URL
-            url_found = None
-            for j in range(i-1, max(0, i-10), -1):
-                url_match = re.search(r'url:\s*(https://[^\s]+go' + re.escape(new_version) + r'[^\s]*)', lines[j])
-                if not url_match:
-                    # Also try with version/name placeholders
-                    url_match = re.search(r'url:\s*(https://[^\s{]+(?:{{\s*\w+\s*}}[^\s{]*)+)', lines[j])
-                    if url_match:
-                        # Expand the URL template
-                        url_template = url_match.group(1)
-                        # Replace common Jinja2 variables
-                        url_found = url_template.replace('{{ version }}', new_version).replace('{{version}}', new_version)
-                        url_found = url_found.replace('{{ name }}', 'go').replace('{{name}}', 'go')
-                        break
-                else:
-                    url_found = url_match.group(1)
-                    break
-
-            if url_found and url_found in sha256_mappings:
-                new_sha256 = sha256_mappings[url_found]
-                line = re.sub(
-                    r'(\s+sha256:\s*)[a-fA-F0-9]{64}',
-                    rf'\g<1>{new_sha256}',
-                    line
-                )
-                print(f"  Updated sha256 for {url_found}")
-
-        updated_lines.append(line)
-        i += 1
+        content = f.read()
+
+    jinja_vars = {"version": new_version, "name": "go"}
+
+    def update_sha256(match):
+        # Expand Jinja2 variables in the URL to look up its new hash
+        url = _JINJA_VAR_RE.sub(
+            lambda m: jinja_vars.get(m.group(1), m.group(0)), match.group(2)
+        )
+        if url not in sha256_mappings:
+            return match.group(0)
+        print(f"  Updated sha256 for {url}")
+        return match.group(1) + sha256_mappings[url]
+
+    # Update version, build number and the sha256 following each source URL
+    # with substitutions over the whole file instead of a per-line loop
+    content = _SET_VERSION_RE.sub(rf'\g<1>{new_version}\g<2>', content)
+    content = _BUILD_NUMBER_RE.sub(r'\g<1>0', content)
+    content = _SOURCE_SHA256_RE.sub(update_sha256, content)
 
     with open(meta_yaml_path, "w") as f:
-        f.writelines(updated_lines)
+        f.write(content)
 
     print("Updated meta.yaml (version, sha256 hashes, and build number)")
 
-    # Commit the meta.yaml changes
-    commit_changes(repo_path, ["recipe/meta.yaml"], f"Update to {new_version}")
-
-    # Run conda-smithy rerender
-    run_conda_smithy_rerender(repo_path)
+    # Rerender first and commit the recipe together with the rerendered
+    # files, falling back to a recipe-only commit if the rerender fails
+    if run_conda_smithy_rerender(repo_path, commit=False, verbose=verbose):
+        commit_changes(repo_path, None, f"Update to {new_version} (rerendered)")
+    else:
+        commit_changes(repo_path, ["recipe/meta.yaml"], f"Update to {new_version}")
 
     # Push to fork
     push_branch(repo_path, update_branch)
@@ -282,9 +327,49 @@ Changes:
     return True
 
 
+def update_feedstock_series(feedstock_name, latest_versions, dry_run=False, verbose=False):
+    """
+    Update a Go feedstock for each minor series with a new release.
+
+    The series are processed one after the other as they share the
+    feedstock's working copy.
+
+    Args:
+        feedstock_name: Name like "go-feedstock" or "go-activation-feedstock"
+        latest_versions: Dict mapping minor series to their latest version
+        dry_run: If True, only check versions without making changes
+        verbose: If True, show the conda-smithy rerender output
+
+    Returns:
+        Tuple of (updated, skipped, errors) lists with
+        (feedstock, series, version or error message) entries
+    """
+    updated = []
+    skipped = []
+    errors = []
+
+    for series, new_version in sorted(latest_versions.items()):
+        print(f"\n{'#'*60}")
+        print(f"Processing Go {new_version} ({series}.x series) for {feedstock_name}")
+        print(f"{'#'*60}")
+
+        try:
+            if update_feedstock(feedstock_name, series, new_version, dry_run=dry_run, verbose=verbose):
+                updated.append((feedstock_name, series, new_version))
+            else:
+                skipped.append((feedstock_name, series, new_version))
+        except Exception as e:
+            print(f"\nError updating {feedstock_name}: {e}")
+            print("Continuing with next series...")
+            errors.append((feedstock_name, series, str(e)))
+
+    return updated, skipped, errors
+
+
 def main():
     # Check for dry-run mode
     dry_run = "--dry-run" in sys.argv or "-n" in sys.argv
+    verbose = "--verbose" in sys.argv or "-v" in sys.argv
 
     if dry_run:
         print("=" * 60)
@@ -310,29 +395,23 @@ def main():
     # We'll assume any version we find on GitHub that we want to update is newer
     # In practice, you might want to check the existing branch's meta.yaml
 
-    # Process each series
+    # The feedstocks are independent of each other, so update them
+    # concurrently. Within a feedstock the series are processed in order.
     feedstocks = ["go-feedstock", "go-activation-feedstock"]
     updates_made = []
     updates_skipped = []
     errors = []
 
-    for series, new_version in sorted(latest_github_versions.items()):
-        print(f"\n{'#'*60}")
-        print(f"Processing Go {new_version} ({series}.x series)")
-        print(f"{'#'*60}")
-
-        for feedstock in feedstocks:
-            try:
-                result = update_feedstock(feedstock, series, new_version, dry_run=dry_run)
-                if result:
-                    updates_made.append((feedstock, series, new_version))
-                else:
-                    updates_skipped.append((feedstock, series, new_version))
-            except Exception as e:
-                print(f"\nError updating {feedstock}: {e}")
-                print("Continuing with next feedstock...")
-                errors.append((feedstock, series, str(e)))
-                continue
+    with ThreadPoolExecutor(max_workers=len(feedstocks)) as executor:
+        futures = [
+            executor.submit(update_feedstock_series, feedstock, latest_github_versions, dry_run, verbose)
+            for feedstock in feedstocks
+        ]
+        for future in futures:
+            updated, skipped, failed = future.result()
+            updates_made.extend(updated)
+            updates_skipped.extend(skipped)
+            errors.extend(failed)
 
     # Print summary
     print(f"\n{'='*60}")
@@ -17,18 +17,25 @@ This script:
 Usage:
     python update_nodejs_releases.py           # Run updates
     python update_nodejs_releases.py --dry-run # Preview changes without making them
+    python update_nodejs_releases.py --verbose # Show the conda-smithy rerender output
 """
 
-import requests
 import subprocess
 import os
+import io
+import multiprocessing
 import re
 import sys
-from packaging.version import parse as parse_version
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from ruamel.yaml import YAML
+from ruamel.yaml.scalarstring import ScalarString
 from feedstock_utils import (
-    get_github_tags,
+    SESSION,
+    get_matching_tags_by_prefix,
     get_current_version_from_recipe,
+    get_remote_version_from_recipe,
     fork_and_clone_feedstock,
     checkout_branch,
     create_update_branch,
@@ -36,9 +43,12 @@ from feedstock_utils import (
     run_conda_smithy_rerender,
     push_branch,
     create_pull_request,
-    check_version_needs_update
+    check_version_needs_update,
+    parse_version,
 )
 
+SHASUMS_CACHE_DIR = Path("~/.cache/cf-tooling/nodejs-shasums").expanduser()
+
 
 def get_nodejs_versions_by_minor_series(target_series):
     """
@@ -50,14 +60,18 @@ def get_nodejs_versions_by_minor_series(target_series):
     Returns:
         Dict mapping minor series to latest version (e.g., {'20': '20.11.0', ...})
     """
+    # Only fetch the tags of the target series instead of all nodejs/node
+    # tags, the trailing dot keeps e.g. "v2" from matching "v20"
     print("Fetching tags from nodejs/node...")
-    tags = get_github_tags("nodejs", "node")
+    tags_by_prefix = get_matching_tags_by_prefix(
+        "nodejs", "node", [f"v{series}." for series in target_series]
+    )
+    tags = [tag for series_tags in tags_by_prefix.values() for tag in series_tags]
 
     # Parse tags and group by minor series
     versions_by_series = defaultdict(list)
 
-    for tag in tags:
-        tag_name = tag["name"]
+    for tag_name in tags:
         # Match tags like "v20.11.0" or "v22.0.0"
         match = re.match(r'^v(\d+\.\d+\.\d+)$', tag_name)
         if match:
@@ -68,14 +82,15 @@ def get_nodejs_versions_by_minor_series(target_series):
                 major = version_str.split('.')[0]
 
                 if major in target_series:
-                    versions_by_series[major].append(version_str)
+                    # Keep the parsed version so max() doesn't parse again
+                    versions_by_series[major].append((version, version_str))
             except Exception as e:
                 print(f"Warning: Could not parse version {version_str}: {e}")
 
     # Get the latest version for each series
     latest_by_series = {}
     for series, versions in versions_by_series.items():
-        latest = max(versions, key=parse_version)
+        latest = max(versions)[1]
         latest_by_series[series] = latest
         print(f"  {series}.x: latest is {latest}")
 
@@ -99,31 +114,48 @@ def get_nodejs_sha256_mappings(version):
 
     # Node.js publishes SHASUMS256.txt files for each release
     shasums_url = f"https://nodejs.org/dist/v{version}/SHASUMS256.txt"
+    # Released artifacts are immutable, so the version is a sufficient cache key
+    cache_path = SHASUMS_CACHE_DIR / f"v{version}.txt"
+
+    # Format: "<sha256>  <filename>"
+    target_files = {
+        f"node-v{version}.tar.gz": "unix",
+        f"node-v{version}-win-x64.zip": "win-x64",
+        f"node-v{version}-win-arm64.zip": "win-arm64",
+    }
 
     try:
-        response = requests.get(shasums_url)
-        response.raise_for_status()
+        if cache_path.exists():
+            lines = cache_path.read_text().splitlines()
+        else:
+            # Stream the file and stop reading once all target files are
+            # found, only those lines are kept for the cache. no-store keeps
+            # the HTTP cache from reading the whole body before returning,
+            # the file on disk already caches the result per version.
+            lines = []
+            remaining = set(target_files)
+            with SESSION.get(
+                shasums_url, stream=True, headers={"Cache-Control": "no-store"}
+            ) as response:
+                response.raise_for_status()
+                for raw_line in response.iter_lines():
+                    line = raw_line.decode("utf-8")
+                    parts = line.split()
+                    if len(parts) >= 2 and parts[1] in remaining:
+                        lines.append(line)
+                        remaining.discard(parts[1])
+                        if not remaining:
+                            break
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text("".join(f"{line}\n" for line in lines))
 
-        # Parse the SHASUMS256.txt file
-        # Format: "<sha256>  <filename>"
         sha256_map = {}
-
-        target_files = {
-            f"node-v{version}.tar.gz": "unix",
-            f"node-v{version}-win-x64.zip": "win-x64",
-            f"node-v{version}-win-arm64.zip": "win-arm64",
-        }
-
-        for line in response.text.splitlines():
+        for line in lines:
             parts = line.split()
-            if len(parts) >= 2:
-                sha256_hash = parts[0]
-                filename = parts[1]
-
-                if filename in target_files:
-                    platform = target_files[filename]
-                    sha256_map[platform] = sha256_hash
-                    print(f"  SHA256 ({platform}): {sha256_hash}")
+            if len(parts) >= 2 and parts[1] in target_files:
+                platform = target_files[parts[1]]
+                sha256_map[platform] = parts[0]
+                print(f"  SHA256 ({platform}): {parts[0]}")
 
         return sha256_map
 
@@ -132,21 +164,118 @@ def get_nodejs_sha256_mappings(version):
         return {}
 
 
-def update_feedstock(feedstock_name, minor_series, new_version, dry_run=False):
+# meta.yaml patterns. They operate on the whole recipe, so anchors are per
+# line and whitespace is restricted to spaces/tabs to avoid matching
+# across lines
+RE_BUILD_NUMBER = re.compile(r'^([ \t]+number:[ \t]*)\d+', re.MULTILINE)
+RE_SHA256 = re.compile(r'^([ \t]+sha256:[ \t]*)[a-fA-F0-9]{64}(.*)$', re.MULTILINE)
+RE_META_VERSION = re.compile(r'({% set version = ")[^"]+(")')
+
+# recipe.yaml `if:` selectors, mapped to get_nodejs_sha256_mappings keys
+RE_SELECTOR = re.compile(r'unix|target_platform\s*==\s*"(win-64|win-arm64)"')
+SELECTOR_PLATFORMS = {"unix": "unix", "win-64": "win-x64", "win-arm64": "win-arm64"}
+
+# Round-trip loader for recipe.yaml, keeps comments, quoting and the
+# conda-forge indentation style of the parts that aren't edited
+RECIPE_YAML = YAML(typ="rt")
+RECIPE_YAML.preserve_quotes = True
+RECIPE_YAML.indent(mapping=2, sequence=4, offset=2)
+RECIPE_YAML.width = 4096
+
+
+def _update_sha256(content, sha256_mappings, platform_for):
+    """Replace every sha256 whose platform_for(match) has a known hash."""
+    def replace(m):
+        platform = platform_for(m)
+        if platform not in sha256_mappings:
+            return m.group(0)
+        print(f"  Updated sha256 for {platform}")
+        return f"{m.group(1)}{sha256_mappings[platform]}{m.group(2)}"
+
+    return RE_SHA256.sub(replace, content)
+
+
+def _update_recipe_yaml(content, new_version, sha256_mappings):
+    """Update version, build number and sha256 hashes in a recipe.yaml."""
+    data = RECIPE_YAML.load(content)
+
+    context = data.get("context") or {}
+    if "version" in context:
+        # Reusing the scalar string type of the old value keeps its quoting
+        # style; unquoted values (e.g. ScalarFloat for 22.11) become plain str
+        old_version = context["version"]
+        if isinstance(old_version, ScalarString):
+            context["version"] = type(old_version)(new_version)
+        else:
+            context["version"] = str(new_version)
+        print(f"  Updated version")
+
+    build = data.get("build") or {}
+    if "number" in build:
+        build["number"] = 0
+        print(f"  Reset build number")
+
+    # Per-platform sources look like `- if: unix` / `then: {url, sha256}`
+    sources = data.get("source") or []
+    for source in sources if isinstance(sources, list) else [sources]:
+        selector = RE_SELECTOR.fullmatch(str(source.get("if", "")).strip())
+        then = source.get("then")
+        if selector is None or not isinstance(then, dict) or "sha256" not in then:
+            continue
+        platform = SELECTOR_PLATFORMS[selector.group(1) or selector.group(0)]
+        if platform in sha256_mappings:
+            then["sha256"] = sha256_mappings[platform]
+            print(f"  Updated sha256 for {platform}")
+
+    stream = io.StringIO()
+    RECIPE_YAML.dump(data, stream)
+    return stream.getvalue()
+
+
+def _update_meta_yaml(content, new_version, sha256_mappings):
+    """Update version, build number and sha256 hashes in a meta.yaml (older Jinja2 format)."""
+    content, n = RE_META_VERSION.subn(rf'\g<1>{new_version}\g<2>', content, count=1)
+    if n:
+        print(f"  Updated version")
+
+    content, n = RE_BUILD_NUMBER.subn(r'\g<1>0', content, count=1)
+    if n:
+        print(f"  Reset build number")
+
+    def platform_for(m):
+        # Detect platform from the inline selector comment
+        selector = m.group(2)
+        if '# [unix]' in selector or '# [not win]' in selector:
+            return 'unix'
+        if '# [target_platform == "win-64"]' in selector or '# [win64]' in selector:
+            return 'win-x64'
+        if '# [target_platform == "win-arm64"]' in selector or '# [win-arm64]' in selector:
+            return 'win-arm64'
+        return None
+
+    return _update_sha256(content, sha256_mappings, platform_for)
+
+
+def update_feedstock(feedstock_name, minor_series, new_version, sha256_mappings, verbose=False):
     """
     Update the Node.js feedstock for a new version.
 
+    The recipe version on GitHub is expected to have been checked by the
+    caller already (see main), so this clones right away.
+
     Args:
         feedstock_name: Name like "nodejs-feedstock"
         minor_series: Minor series like "20"
         new_version: New version like "20.11.0"
-        dry_run: If True, only check versions without making changes
+        sha256_mappings: Prefetched result of get_nodejs_sha256_mappings
+        verbose: If True, show the conda-smithy rerender output
 
     Returns:
-        True if update was performed (or would be performed), False if skipped
+        True if update was performed, False if skipped
     """
     repo_name = f"conda-forge/{feedstock_name}"
-    repo_path = feedstock_name
+    # One working copy per series so that the series can be updated concurrently
+    repo_path = f"{feedstock_name}-{minor_series}"
     branch_name = f"{minor_series}.x"
     update_branch = f"update-{new_version}"
 
@@ -169,126 +298,41 @@ def update_feedstock(feedstock_name, minor_series, new_version, dry_run=False):
     if not check_version_needs_update(current_version, new_version):
         return False
 
-    if dry_run:
-        print(f"\n[DRY RUN] Would update {feedstock_name} from {current_version} to {new_version}")
-        return True
-
     # Create new update branch
     create_update_branch(repo_path, update_branch)
 
-    # Fetch SHA256 hashes for Node.js distributions
-    print(f"Fetching SHA256 hashes for Node.js {new_version}...")
-    sha256_mappings = get_nodejs_sha256_mappings(new_version)
-
     if not sha256_mappings:
         print("Warning: Could not fetch SHA256 hashes. Continuing without hash update...")
 
-    # Check if using recipe.yaml or meta.yaml
+    # Check if using recipe.yaml or meta.yaml, decided once and reused below
     recipe_yaml_path = os.path.join(repo_path, "recipe", "recipe.yaml")
     meta_yaml_path = os.path.join(repo_path, "recipe", "meta.yaml")
 
-    if os.path.exists(recipe_yaml_path):
-        recipe_path = recipe_yaml_path
-        is_recipe_yaml = True
-    elif os.path.exists(meta_yaml_path):
-        recipe_path = meta_yaml_path
-        is_recipe_yaml = False
-    else:
+    is_recipe_yaml = os.path.exists(recipe_yaml_path)
+    recipe_path = recipe_yaml_path if is_recipe_yaml else meta_yaml_path
+    if not is_recipe_yaml and not os.path.exists(meta_yaml_path):
         raise FileNotFoundError("Neither recipe.yaml nor meta.yaml found")
+    recipe_file = os.path.relpath(recipe_path, repo_path)
 
     print(f"Updating {recipe_path}...")
 
     with open(recipe_path, "r") as f:
-        lines = f.readlines()
-
-    # Process line by line
-    updated_lines = []
-    current_platform = None  # Track which platform section we're in (for recipe.yaml)
-
-    for line in lines:
-        original_line = line
-
-        if is_recipe_yaml:
-            # For recipe.yaml format
-            # Update version in context section
-            if re.match(r'^\s*version:\s*["\']?[0-9.]+', line):
-                line = re.sub(
-                    r'(^\s*version:\s*["\']?)[0-9.]+(["\']?)',
-                    rf'\g<1>{new_version}\g<2>',
-                    line
-                )
-                print(f"  Updated version")
-
-            # Update build number
-            elif re.match(r'^\s+number:\s*\d+', line):
-                line = re.sub(r'(^\s+number:\s*)\d+', r'\g<1>0', line)
-                print(f"  Reset build number")
-
-            # Detect platform context for sha256 updates
-            elif re.search(r'if:\s*unix', line):
-                current_platform = 'unix'
-            elif re.search(r'if:\s*target_platform\s*==\s*"win-64"', line):
-                current_platform = 'win-x64'
-            elif re.search(r'if:\s*target_platform\s*==\s*"win-arm64"', line):
-                current_platform = 'win-arm64'
-
-            # Update sha256 based on current platform context
-            elif re.match(r'^\s+sha256:\s*[a-fA-F0-9]{64}', line) and current_platform:
-                if current_platform in sha256_mappings:
-                    line = re.sub(
-                        r'(^\s+sha256:\s*)[a-fA-F0-9]{64}',
-                        rf'\g<1>{sha256_mappings[current_platform]}',
-                        line
-                    )
-                    print(f"  Updated sha256 for {current_platform}")
-        else:
-            # For meta.yaml format (older Jinja2 format)
-            # Update version
-            if re.match(r'\s*{%\s*set\s+version\s*=', line):
-                line = re.sub(
-                    r'({% set version = ")[^"]+(")',
-                    rf'\g<1>{new_version}\g<2>',
-                    line
-                )
-                print(f"  Updated version")
-
-            # Update build number
-            elif re.match(r'\s+number:\s*\d+', line):
-                line = re.sub(r'(\s+number:\s*)\d+', r'\g<1>0', line)
-                print(f"  Reset build number")
-
-            # Update sha256 based on platform selector
-            elif re.match(r'\s+sha256:\s*[a-fA-F0-9]{64}', line):
-                # Detect platform from inline selector comment
-                platform_key = None
-                if '# [unix]' in line or '# [not win]' in line:
-                    platform_key = 'unix'
-                elif '# [target_platform == "win-64"]' in line or '# [win64]' in line:
-                    platform_key = 'win-x64'
-                elif '# [target_platform == "win-arm64"]' in line or '# [win-arm64]' in line:
-                    platform_key = 'win-arm64'
-
-                if platform_key and platform_key in sha256_mappings:
-                    line = re.sub(
-                        r'(\s+sha256:\s*)[a-fA-F0-9]{64}',
-                        rf'\g<1>{sha256_mappings[platform_key]}',
-                        line
-                    )
-                    print(f"  Updated sha256 for {platform_key}")
-
-        updated_lines.append(line)
+        content = f.read()
 
-    with open(recipe_path, "w") as f:
-        f.writelines(updated_lines)
+    update_recipe = _update_recipe_yaml if is_recipe_yaml else _update_meta_yaml
+    content = update_recipe(content, new_version, sha256_mappings)
 
-    print(f"Updated {'recipe.yaml' if is_recipe_yaml else 'meta.yaml'} (version, sha256 hashes, and build number)")
+    with open(recipe_path, "w") as f:
+        f.write(content)
 
-    # Commit the recipe changes
-    recipe_file = "recipe/recipe.yaml" if os.path.exists(recipe_yaml_path) else "recipe/meta.yaml"
-    commit_changes(repo_path, [recipe_file], f"Update to {new_version}")
+    print(f"Updated {os.path.basename(recipe_path)} (version, sha256 hashes, and build number)")
 
-    # Run conda-smithy rerender
-    run_conda_smithy_rerender(repo_path)
+    # Rerender first and commit the recipe together with the rerendered
+    # files, falling back to a recipe-only commit if the rerender fails
+    if run_conda_smithy_rerender(repo_path, commit=False, verbose=verbose):
+        commit_changes(repo_path, None, f"Update to {new_version} (rerendered)")
+    else:
+        commit_changes(repo_path, [recipe_file], f"Update to {new_version}")
 
     # Push to fork
     push_branch(repo_path, update_branch)
@@ -311,6 +355,7 @@ Changes:
 def main():
     # Check for dry-run mode
     dry_run = "--dry-run" in sys.argv or "-n" in sys.argv
+    verbose = "--verbose" in sys.argv or "-v" in sys.argv
 
     if dry_run:
         print("=" * 60)
@@ -335,29 +380,79 @@ def main():
     for series, version in sorted(latest_github_versions.items(), key=lambda x: int(x[0])):
         print(f"  {series}.x: {version}")
 
-    # Process each series
     feedstock = "nodejs-feedstock"
     updates_made = []
     updates_skipped = []
     errors = []
 
-    for series, new_version in sorted(latest_github_versions.items(), key=lambda x: int(x[0])):
-        print(f"\n{'#'*60}")
-        print(f"Processing Node.js {new_version} ({series}.x series)")
-        print(f"{'#'*60}")
+    # Check the recipes of all series on GitHub concurrently, so that
+    # up-to-date series need neither a clone nor a SHASUMS download
+    all_series = sorted(latest_github_versions, key=int)
+    print(f"\nChecking {feedstock} recipes on GitHub...")
+    with ThreadPoolExecutor(max_workers=len(all_series)) as executor:
+        current_versions = dict(zip(all_series, executor.map(
+            lambda series: get_remote_version_from_recipe(f"conda-forge/{feedstock}", f"{series}.x"),
+            all_series,
+        )))
+
+    to_update = {}
+    for series in all_series:
+        new_version = latest_github_versions[series]
+        current_version = current_versions[series]
+        # Series whose version can't be determined are left to the local
+        # check in update_feedstock
+        if current_version is not None and parse_version(new_version) <= parse_version(current_version):
+            print(f"  {series}.x: {current_version} is up-to-date")
+            updates_skipped.append((series, current_version))
+        else:
+            to_update[series] = new_version
 
-        try:
-            result = update_feedstock(feedstock, series, new_version, dry_run=dry_run)
-            if result:
-                updates_made.append((series, new_version))
-            else:
+    if dry_run:
+        # The remote versions are all a dry run needs, so report directly
+        for series, new_version in to_update.items():
+            current_version = current_versions[series]
+            if current_version is None:
+                print(f"Warning: Branch {series}.x does not exist in {feedstock}. Skipping.")
                 updates_skipped.append((series, new_version))
-        except Exception as e:
-            print(f"\nError updating {feedstock}: {e}")
-            import traceback
-            traceback.print_exc()
-            errors.append((series, str(e)))
-            continue
+            else:
+                print(f"[DRY RUN] Would update {feedstock} {series}.x from {current_version} to {new_version}")
+                updates_made.append((series, new_version))
+
+    # Prefetch the SHA256 hashes of all new versions concurrently so that
+    # update_feedstock only does local work
+    sha256_by_version = {}
+    if to_update and not dry_run:
+        versions = sorted(set(to_update.values()))
+        with ThreadPoolExecutor(max_workers=len(versions)) as executor:
+            sha256_by_version = dict(zip(versions, executor.map(get_nodejs_sha256_mappings, versions)))
+
+    # Process the series concurrently, each one in its own working copy.
+    # conda-smithy rerender is CPU-heavy, so use processes rather than
+    # threads. Spawned workers start with a fresh HTTP session instead of
+    # inheriting the parent's cache connection.
+    if to_update and not dry_run:
+        with ProcessPoolExecutor(
+            max_workers=len(to_update), mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = {
+                series: executor.submit(
+                    update_feedstock, feedstock, series, new_version,
+                    sha256_by_version[new_version], verbose=verbose
+                )
+                for series, new_version in to_update.items()
+            }
+            for series, future in futures.items():
+                new_version = to_update[series]
+                try:
+                    if future.result():
+                        updates_made.append((series, new_version))
+                    else:
+                        updates_skipped.append((series, new_version))
+                except Exception as e:
+                    print(f"\nError updating {feedstock} {series}.x: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    errors.append((series, str(e)))
 
     # Print summary
     print(f"\n{'='*60}")